@@ -0,0 +1,131 @@
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional
+from playwright.async_api import async_playwright, Browser, BrowserContext, Playwright
+from playwright_config import get_optimized_browser_config, install_resource_blocker
+
+# 同時進行的爬取數量上限
+MAX_CONCURRENT = int(os.getenv("MAX_CONCURRENT", 4))
+
+# 已在運行的Chromium的CDP位址，例如 http://localhost:9222
+CDP_URL = os.getenv("CDP_URL")
+
+class BrowserPool:
+    """共用的Chromium瀏覽器池
+    
+    整個進程只啟動一次瀏覽器，每個網站共用一個瀏覽器上下文，
+    每次爬取只在其中開關頁面，同網站的請求可共用Cookie。
+    上下文設有資源攔截路由，Playwright會因此停用HTTP快取
+    """
+    
+    def __init__(self, max_concurrent: int = MAX_CONCURRENT):
+        """初始化瀏覽器池
+        
+        Args:
+            max_concurrent: 同時進行的爬取數量上限
+        """
+        self.max_concurrent = max_concurrent
+        self._playwright: Optional[Playwright] = None
+        self._browser: Optional[Browser] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._contexts: Dict[str, BrowserContext] = {}
+    
+    async def start(self) -> None:
+        """啟動Playwright和瀏覽器
+        
+        設定了CDP_URL時連接到已在運行的Chromium，否則自行啟動瀏覽器。
+        瀏覽器崩潰或CDP連線中斷後再次呼叫會重新啟動
+        """
+        self._ensure_primitives()
+        async with self._lock:
+            await self._start_locked()
+    
+    def _ensure_primitives(self) -> None:
+        """在事件迴圈中建立並行控制用的信號量和鎖"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)
+            self._lock = asyncio.Lock()
+    
+    async def _start_locked(self) -> None:
+        """啟動瀏覽器，瀏覽器仍連線時不做任何事；呼叫者需持有self._lock"""
+        if self._is_ready():
+            return
+        self._contexts.clear()
+        if self._playwright is None:
+            self._playwright = await async_playwright().start()
+        if CDP_URL:
+            browser = await self._playwright.chromium.connect_over_cdp(CDP_URL)
+        else:
+            browser = await self._playwright.chromium.launch(**get_optimized_browser_config())
+        browser.on("disconnected", self._on_disconnected)
+        self._browser = browser
+    
+    def _on_disconnected(self, browser: Browser) -> None:
+        """瀏覽器斷線時丟棄瀏覽器和所有上下文，下次借出時重新啟動"""
+        if self._browser is browser:
+            self._browser = None
+            self._contexts.clear()
+    
+    def _on_context_close(self, site_key: str, context: BrowserContext) -> None:
+        """上下文被關閉時從快取中移除"""
+        if self._contexts.get(site_key) is context:
+            del self._contexts[site_key]
+    
+    def _is_ready(self) -> bool:
+        """瀏覽器是否已啟動且仍連線"""
+        return self._browser is not None and self._browser.is_connected()
+    
+    async def close(self) -> None:
+        """關閉所有瀏覽器上下文、瀏覽器和Playwright"""
+        contexts = list(self._contexts.values())
+        self._contexts.clear()
+        for context in contexts:
+            await context.close()
+        browser, self._browser = self._browser, None
+        if browser is not None:
+            await browser.close()
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+    
+    async def get_context(self, site_key: str) -> BrowserContext:
+        """獲取指定網站共用的瀏覽器上下文，不存在時建立
+        
+        Args:
+            site_key: 網站識別鍵
+        
+        Returns:
+            BrowserContext: 已設定視窗大小和資源攔截的瀏覽器上下文
+        """
+        self._ensure_primitives()
+        async with self._lock:
+            # 等待鎖期間瀏覽器可能已斷線，需在鎖內重新檢查
+            await self._start_locked()
+            context = self._contexts.get(site_key)
+            if context is None:
+                context = await self._browser.new_context(viewport={"width": 1280, "height": 800})
+                context.on("close", lambda c: self._on_context_close(site_key, c))
+                await install_resource_blocker(context)
+                self._contexts[site_key] = context
+            return context
+    
+    @asynccontextmanager
+    async def acquire(self, site_key: str = 'default') -> AsyncIterator[BrowserContext]:
+        """借出指定網站共用的瀏覽器上下文，並佔用一個並行名額
+        
+        上下文由瀏覽器池管理，使用者只需開關自己的頁面
+        
+        Args:
+            site_key: 網站識別鍵
+        
+        Yields:
+            BrowserContext: Playwright瀏覽器上下文
+        """
+        self._ensure_primitives()
+        async with self._semaphore:
+            yield await self.get_context(site_key)
+
+# 進程共用的瀏覽器池
+browser_pool = BrowserPool()
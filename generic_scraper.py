@@ -1,22 +1,56 @@
 import asyncio
+from pathlib import Path
 from typing import Dict, List, Optional, Any
-from playwright.async_api import async_playwright, Page
+from playwright.async_api import async_playwright, BrowserContext, Page
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
 from scraper_base import ScraperBase
-from playwright_config import get_optimized_browser_config
+from playwright_config import get_optimized_browser_config, install_resource_blocker
 import json
 
+# 寫入HTML檔案時每次寫入的字元數
+_WRITE_CHUNK_SIZE = 1 << 20
+
+def _write_text_chunked(path: Path, text: str, chunk_size: int = _WRITE_CHUNK_SIZE) -> None:
+    """分段將文字寫入檔案，避免一次編碼整份HTML"""
+    with open(path, 'w', encoding='utf-8') as f:
+        for start in range(0, len(text), chunk_size):
+            f.write(text[start:start + chunk_size])
+
 class GenericScraper(ScraperBase):
     """通用網站爬蟲實現，可爬取任意URL的網頁內容"""
     
+    # 「載入更多」按鈕的候選選擇器
+    load_more_selectors = (
+        'button.load-more', '.btn-load-more', 'a.more', 
+        '[class*="load-more"]', '[class*="loadMore"]',
+        'button:has-text("載入更多")', 'button:has-text("加載更多")',
+        'button:has-text("Load more")', 'a:has-text("Show more")'
+    )
+    
+    # 滾動參數
+    max_scrolls = 80  # 最多滾動次數，避免無限捲動的頁面永遠不結束
+    max_consecutive_same = 5  # 連續5次相同高度才確定真的沒有更多內容
+    initial_wait = 0.8  # 每次滾動後等待新內容的初始秒數
+    backoff = 1.5  # 沒有新內容時等待時間的倍增係數
+    max_wait = 4.0  # 等待時間上限（秒）
+    
     def __init__(self):
         super().__init__('default')
+        # 合併候選選擇器，一次查詢即可找到按鈕
+        self._load_more_selector = ', '.join(self.load_more_selectors)
     
-    async def scrape(self, url: str, params: Optional[Dict[str, str]] = None) -> List[Dict[str, Any]]:
+    async def scrape(self, url: str, params: Optional[Dict[str, str]] = None,
+                     context: Optional[BrowserContext] = None, include_html: bool = True,
+                     html_sink: Optional[Path] = None) -> List[Dict[str, Any]]:
         """抓取任意網站的內容
         
         Args:
             url: 目標網站URL
             params: 可選的URL參數
+            context: 可選的瀏覽器上下文，提供時不再自行啟動瀏覽器，
+                只在其中開關頁面，上下文本身由呼叫者管理
+            include_html: 是否在結果中包含完整HTML
+            html_sink: 可選的檔案路徑，提供時HTML寫入該檔案而不放入結果
             
         Returns:
             包含網頁內容的字典
@@ -32,130 +66,168 @@ class GenericScraper(ScraperBase):
             
         self.logger.info(f'開始抓取: {url}')
         
+        if context is not None:
+            # 使用瀏覽器池提供的上下文，只開關頁面
+            page = await context.new_page()
+            try:
+                return await self._scrape_page(page, url, include_html, html_sink)
+            finally:
+                await page.close()
+        
         async with async_playwright() as p:
             # 啟動瀏覽器，使用優化配置
             browser = await p.chromium.launch(**get_optimized_browser_config())
-            page = await browser.new_page()
             
             try:
-                # 設置視窗大小
-                await page.set_viewport_size({"width": 1280, "height": 800})
-                
-                # 訪問頁面
-                await page.goto(url, wait_until="networkidle")
-                await page.wait_for_load_state("networkidle")
-                await asyncio.sleep(2)
-                
-                # 滾動加載更多內容
-                self.logger.info('開始滾動加載更多內容...')
-                last_height = 0
-                consecutive_same_count = 0
-                max_consecutive_same = 5  # 連續5次相同高度才確定真的沒有更多內容
-                scroll_count = 0
-                
-                while True:
-                    # 滾動到底部
-                    await page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
-                    await asyncio.sleep(2)  # 等待內容加載
-                    
-                    # 獲取當前頁面高度
-                    current_height = await page.evaluate("document.body.scrollHeight")
-                    scroll_count += 1
-                    
-                    self.logger.info(f'滾動 {scroll_count} 次，當前頁面高度: {current_height}')
-                    
-                    if current_height == last_height:
-                        consecutive_same_count += 1
-                        self.logger.info(f'連續 {consecutive_same_count} 次沒有新內容')
-                        
-                        # 嘗試點擊「載入更多」按鈕（如果存在）
-                        try:
-                            load_more_selectors = [
-                                'button.load-more', '.btn-load-more', 'a.more', 
-                                '[class*="load-more"]', '[class*="loadMore"]',
-                                'button:has-text("載入更多")', 'button:has-text("加載更多")',
-                                'button:has-text("Load more")', 'a:has-text("Show more")'
-                            ]
-                            
-                            for selector in load_more_selectors:
-                                load_more_button = await page.query_selector(selector)
-                                if load_more_button:
-                                    await load_more_button.click()
-                                    await asyncio.sleep(2)
-                                    self.logger.info(f'點擊了「{selector}」按鈕')
-                                    break
-                        except Exception as e:
-                            self.logger.debug(f'沒有找到或無法點擊載入更多按鈕: {e}')
-                        
-                        if consecutive_same_count >= max_consecutive_same:
-                            self.logger.info('已達到頁面底部，停止滾動')
-                            break
-                    else:
-                        consecutive_same_count = 0
-                        self.logger.info(f'發現新內容，頁面高度從 {last_height} 增加到 {current_height}')
-                    
-                    last_height = current_height
-                
-                # 獲取頁面HTML內容
-                html_content = await page.content()
-                page_title = await page.title()
-                page_url = page.url
-                
-                # 提取頁面元數據
-                metadata = await self._extract_metadata(page)
-                
-                return [{
-                    'url': page_url,
-                    'title': page_title,
-                    'html': html_content,
-                    'metadata': metadata
-                }]
-                
+                context = await browser.new_context(viewport={"width": 1280, "height": 800})
+                await install_resource_blocker(context)
+                page = await context.new_page()
+                return await self._scrape_page(page, url, include_html, html_sink)
             finally:
                 await browser.close()
     
-    async def _extract_metadata(self, page: Page) -> Dict[str, str]:
-        """提取頁面元數據
+    async def _scrape_page(self, page: Page, url: str, include_html: bool = True,
+                           html_sink: Optional[Path] = None) -> List[Dict[str, Any]]:
+        """在指定頁面中載入URL並抓取內容
         
         Args:
             page: Playwright頁面對象
+            url: 目標網站URL（已包含參數）
+            include_html: 是否在結果中包含完整HTML
+            html_sink: 可選的檔案路徑，提供時HTML寫入該檔案而不放入結果
             
         Returns:
-            包含元數據的字典
+            包含網頁內容的字典
         """
-        metadata = {}
+        # 訪問頁面
+        await page.goto(url, wait_until="domcontentloaded", timeout=15000)
         
-        # 提取所有meta標籤
-        meta_elements = await page.query_selector_all('meta')
+        # 滾動加載更多內容
+        self.logger.info('開始滾動加載更多內容...')
+        last_height = 0
+        consecutive_same_count = 0
+        scroll_count = 0
+        wait = self.initial_wait
         
-        for meta in meta_elements:
-            try:
-                name = await meta.get_attribute('name') or await meta.get_attribute('property')
-                content = await meta.get_attribute('content')
+        while True:
+            # 滾動到底部
+            await page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
+            await self._wait_for_more_content(page, last_height, int(wait * 1000))  # 等待內容加載
+            
+            # 獲取當前頁面高度
+            current_height = await page.evaluate("document.body.scrollHeight")
+            scroll_count += 1
+            
+            self.logger.info(f'滾動 {scroll_count} 次，當前頁面高度: {current_height}')
+            
+            if current_height == last_height:
+                consecutive_same_count += 1
+                wait = min(wait * self.backoff, self.max_wait)
+                self.logger.info(f'連續 {consecutive_same_count} 次沒有新內容')
+                
+                # 嘗試點擊「載入更多」按鈕（如果存在），新內容由下一次滾動的等待處理
+                load_more_button = page.locator(self._load_more_selector).first
+                try:
+                    # is_visible不等待，沒有按鈕時立即返回False
+                    if await load_more_button.is_visible():
+                        await load_more_button.click(timeout=2000)
+                        self.logger.info('點擊了「載入更多」按鈕')
+                except PlaywrightTimeoutError:
+                    pass
+                except Exception as e:
+                    self.logger.debug(f'沒有找到或無法點擊載入更多按鈕: {e}')
                 
-                if name and content:
-                    metadata[name] = content
-            except Exception as e:
-                self.logger.debug(f'提取meta標籤時出錯: {e}')
+                if consecutive_same_count >= self.max_consecutive_same:
+                    self.logger.info('已達到頁面底部，停止滾動')
+                    break
+            else:
+                consecutive_same_count = 0
+                wait = self.initial_wait
+                self.logger.info(f'發現新內容，頁面高度從 {last_height} 增加到 {current_height}')
+            
+            last_height = current_height
+            
+            if scroll_count >= self.max_scrolls:
+                self.logger.info(f'已達到最大滾動次數 {self.max_scrolls}，停止滾動')
+                break
+        
+        # 獲取頁面HTML內容
+        page_title = await page.title()
+        page_url = page.url
+        
+        # 提取頁面元數據
+        metadata = await self._extract_metadata(page)
         
-        return metadata
+        result = {
+            'url': page_url,
+            'title': page_title,
+            'metadata': metadata
+        }
+        
+        if html_sink is not None:
+            # 先取得完整HTML再寫入檔案，在執行緒中分段寫入避免阻塞事件迴圈
+            html = await page.content()
+            await asyncio.get_running_loop().run_in_executor(None, _write_text_chunked, Path(html_sink), html)
+            result['html_path'] = str(html_sink)
+        elif include_html:
+            result['html'] = await page.content()
+        
+        return [result]
+    
+    async def _wait_for_more_content(self, page: Page, prev_height: int, timeout: int = 800) -> bool:
+        """等待頁面載入新內容
+        
+        在頁面中使用MutationObserver監聽DOM變化，頁面高度超過prev_height時立即返回，
+        取代固定秒數的等待
+        
+        Args:
+            page: Playwright頁面對象
+            prev_height: 滾動前的頁面高度
+            timeout: 最長等待時間（毫秒）
+            
+        Returns:
+            是否在超時前載入了新內容
+        """
+        return await page.evaluate(
+            """(args) => new Promise(resolve => {
+                if (document.body.scrollHeight > args.prev) { resolve(true); return; }
+                const obs = new MutationObserver(() => {
+                    if (document.body.scrollHeight > args.prev) { obs.disconnect(); resolve(true); }
+                });
+                obs.observe(document.body, {childList: true, subtree: true});
+                setTimeout(() => { obs.disconnect(); resolve(false); }, args.timeout);
+            })""",
+            {"prev": prev_height, "timeout": timeout}
+        )
+    
+    async def _extract_metadata(self, page: Page) -> Dict[str, str]:
+        """提取頁面元數據
+        
+        Args:
+            page: Playwright頁面對象
+            
+        Returns:
+            包含元數據的字典
+        """
+        # 在頁面中一次讀取所有帶content的meta標籤，name優先於property
+        return await page.evaluate("""() => Object.fromEntries(
+            Array.from(document.querySelectorAll('meta[content]'))
+                .map(m => [m.getAttribute('name') || m.getAttribute('property'), m.getAttribute('content')])
+                .filter(([n, c]) => n && c)
+        )""")
 
 # 測試代碼
 async def test_scraper():
     scraper = GenericScraper()
     url = input("請輸入要爬取的URL: ")
-    results = await scraper.scrape(url)
+    # HTML直接保存到文件
+    results = await scraper.scrape(url, html_sink=Path('scraped_page.html'))
     
     if results:
         print(f"\n成功爬取: {results[0]['title']}")
         print(f"URL: {results[0]['url']}")
         print(f"元數據: {json.dumps(results[0]['metadata'], indent=2, ensure_ascii=False)}")
-        print(f"HTML長度: {len(results[0]['html'])} 字符")
-        
-        # 保存HTML到文件
-        with open('scraped_page.html', 'w', encoding='utf-8') as f:
-            f.write(results[0]['html'])
-        print("HTML內容已保存到 scraped_page.html")
+        print(f"HTML內容已保存到 {results[0]['html_path']}")
 
 if __name__ == '__main__':
     asyncio.run(test_scraper())
\ No newline at end of file
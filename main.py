@@ -1,12 +1,28 @@
 import os
 import json
-from typing import Dict, List, Optional, Any
+import asyncio
+import importlib
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Dict, FrozenSet, Iterator, List, Optional, Any, Tuple
+import orjson
 from fastapi import FastAPI, HTTPException
-from fastapi.responses import JSONResponse, HTMLResponse
+from fastapi.responses import HTMLResponse, ORJSONResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from pydantic import BaseModel
-from scraper_base import ScraperBase
+from scraper_base import ScraperBase, clear_config_cache
 from generic_scraper import GenericScraper
+from browser_pool import browser_pool
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """應用生命週期：啟動時建立共用的爬蟲實例和瀏覽器池，結束時關閉"""
+    _build_scrapers()
+    await browser_pool.start()
+    yield
+    await browser_pool.close()
 
 # 創建FastAPI應用
 app = FastAPI(
@@ -14,7 +30,9 @@ app = FastAPI(
     description="提供多個網站的爬蟲服務API，包含各大活動平台的活動資訊爬取功能",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
 # 添加CORS中間件
@@ -26,6 +44,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 壓縮較大的響應（例如包含完整HTML的爬取結果）
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
 class ScrapeRequest(BaseModel):
     """爬蟲請求模型
     
@@ -46,9 +67,11 @@ class GenericScrapeRequest(BaseModel):
     Attributes:
         url: 要爬取的網頁URL
         params: 可選的URL參數
+        include_html: 是否在結果中包含完整HTML，只需要元數據時可設為false
     """    
     url: str
     params: Optional[Dict[str, str]] = None
+    include_html: bool = True
 
 class ScrapeResponse(BaseModel):
     """爬蟲響應模型
@@ -66,6 +89,180 @@ class ScrapeResponse(BaseModel):
     data: List[Dict[str, Any]]
     message: Optional[str] = None
 
+def _import_scraper_cls(site: str) -> type:
+    """導入網站專用的爬蟲類別，不存在時使用通用爬蟲"""
+    try:
+        scraper_module = importlib.import_module(f"{site}_scraper")
+        return getattr(scraper_module, f"{site.capitalize()}Scraper")
+    except (ImportError, AttributeError):
+        return GenericScraper
+
+def _load_sites() -> None:
+    """從配置文件中讀取支持的網站，建立爬蟲類別和預設URL的對照表"""
+    global _SITES, _SITES_BYTES, AVAILABLE_SITES, AVAILABLE_SITES_STR, SCRAPER_REGISTRY, SITE_URLS
+    sites_config = ScraperBase('default').config['sites']
+    
+    _SITES = list(sites_config.keys())
+    _SITES_BYTES = orjson.dumps({"sites": _SITES})
+    AVAILABLE_SITES = frozenset(sites_config)
+    AVAILABLE_SITES_STR = ", ".join(sorted(AVAILABLE_SITES))
+    SCRAPER_REGISTRY = {site: _import_scraper_cls(site) for site in sites_config}
+    # 通用爬蟲在用戶沒有提供URL時使用的預設URL
+    SITE_URLS = {
+        site: f"{site_config['base_url']}{site_config.get('search_path', '')}"
+        for site, site_config in sites_config.items()
+        if site_config.get('base_url')
+    }
+
+# 支持的網站和對應的爬蟲類別，啟動時建立一次
+_SITES: List[str] = []
+_SITES_BYTES = b""
+AVAILABLE_SITES: FrozenSet[str] = frozenset()
+AVAILABLE_SITES_STR = ""
+SCRAPER_REGISTRY: Dict[str, type] = {}
+SITE_URLS: Dict[str, str] = {}
+_load_sites()
+
+def _build_scrapers() -> None:
+    """為每個支持的網站建立共用的爬蟲實例，沒有專用爬蟲的網站共用同一個通用爬蟲"""
+    app.state.generic_scraper = GenericScraper()
+    app.state.scrapers = {
+        site: app.state.generic_scraper if scraper_class is GenericScraper else scraper_class()
+        for site, scraper_class in SCRAPER_REGISTRY.items()
+    }
+
+# 串流輸出HTML時每次編碼的字元數
+_HTML_CHUNK_SIZE = 64 * 1024
+
+def _stream_scrape_response(results: List[Dict[str, Any]], message: str) -> Iterator[bytes]:
+    """逐段輸出與ScrapeResponse格式相同的JSON
+    
+    html欄位會被分段編碼輸出，避免一次產生整份已轉義的HTML副本
+    
+    Args:
+        results: 爬取到的資料列表
+        message: 執行結果描述
+        
+    Yields:
+        JSON片段
+    """
+    yield b'{"status":"success","data":['
+    for i, item in enumerate(results):
+        if i:
+            yield b','
+        html = item.get('html')
+        if html is None:
+            yield orjson.dumps(item)
+            continue
+        
+        rest = {k: v for k, v in item.items() if k != 'html'}
+        yield orjson.dumps(rest)[:-1] + (b',"html":"' if rest else b'"html":"')
+        for start in range(0, len(html), _HTML_CHUNK_SIZE):
+            # 去掉orjson加上的前後引號，只保留轉義後的內容
+            yield orjson.dumps(html[start:start + _HTML_CHUNK_SIZE])[1:-1]
+        yield b'"}'
+    yield b'],"message":' + orjson.dumps(message) + b'}'
+
+async def _run_scrape(request: ScrapeRequest) -> List[Dict[str, Any]]:
+    """檢查網站並執行對應的爬蟲
+    
+    Args:
+        request: 包含目標網站和參數的請求對象
+        
+    Returns:
+        爬取到的資料列表
+        
+    Raises:
+        HTTPException: 網站不在配置中
+    """
+    # 檢查網站是否在配置中
+    if request.site not in AVAILABLE_SITES:
+        raise HTTPException(status_code=400, detail=f"不支持的網站: {request.site}，可用的網站有: {AVAILABLE_SITES_STR}")
+    
+    # 獲取對應的爬蟲類別，沒有專用爬蟲的網站使用通用爬蟲
+    scraper = app.state.scrapers[request.site]
+    
+    # 通用爬蟲在用戶沒有提供URL時使用配置中的URL
+    if SCRAPER_REGISTRY[request.site] is GenericScraper and not request.url:
+        request.url = SITE_URLS.get(request.site)
+    
+    # 從瀏覽器池借出該網站共用的上下文執行爬蟲
+    async with browser_pool.acquire(request.site) as context:
+        results = await scraper.scrape(
+            url=request.url,
+            params=request.params,
+            context=context
+        )
+    
+    return results
+
+# 相同爬蟲請求的結果快取秒數，設為0可停用快取
+SCRAPE_CACHE_TTL = float(os.getenv("SCRAPE_CACHE_TTL", 5))
+# 結果快取的最大筆數
+_SCRAPE_CACHE_SIZE = 128
+
+# 進行中的爬取，相同請求共用同一個任務
+_inflight_scrapes: Dict[tuple, "asyncio.Task[List[Dict[str, Any]]]"] = {}
+# 最近完成的爬取結果：請求鍵 -> (完成時間, 結果)
+_recent_scrapes: "OrderedDict[tuple, Tuple[float, List[Dict[str, Any]]]]" = OrderedDict()
+
+async def _scrape_and_cache(key: tuple, request: ScrapeRequest) -> List[Dict[str, Any]]:
+    """執行爬蟲並將結果放入快取，完成後移除進行中的記錄
+    
+    Args:
+        key: 請求鍵
+        request: 包含目標網站和參數的請求對象
+        
+    Returns:
+        爬取到的資料列表
+    """
+    try:
+        results = await _run_scrape(request)
+    finally:
+        _inflight_scrapes.pop(key, None)
+    
+    if SCRAPE_CACHE_TTL > 0:
+        now = time.monotonic()
+        _recent_scrapes[key] = (now, results)
+        _recent_scrapes.move_to_end(key)
+        # 快取依完成時間排序，從最舊的開始移除過期或超出數量的結果，避免長期佔用記憶體
+        while _recent_scrapes:
+            oldest_key, (finished, _) = next(iter(_recent_scrapes.items()))
+            if now - finished < SCRAPE_CACHE_TTL and len(_recent_scrapes) <= _SCRAPE_CACHE_SIZE:
+                break
+            del _recent_scrapes[oldest_key]
+    return results
+
+async def _coalesced_scrape(request: ScrapeRequest) -> List[Dict[str, Any]]:
+    """執行爬蟲，合併相同的請求
+    
+    相同網站、URL和參數的請求在進行中時只爬取一次，所有請求共用結果；
+    完成後的結果在SCRAPE_CACHE_TTL秒內直接重用。
+    爬取在獨立的任務中執行，任一請求被取消（例如客戶端斷線）不影響其他等待者
+    
+    Args:
+        request: 包含目標網站和參數的請求對象
+        
+    Returns:
+        爬取到的資料列表
+    """
+    key = (request.site, request.url, tuple(sorted((request.params or {}).items())))
+    
+    cached = _recent_scrapes.get(key)
+    if cached is not None:
+        if time.monotonic() - cached[0] < SCRAPE_CACHE_TTL:
+            return cached[1]
+        _recent_scrapes.pop(key, None)
+    
+    task = _inflight_scrapes.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_scrape_and_cache(key, request))
+        _inflight_scrapes[key] = task
+    return await asyncio.shield(task)
+
+# 根路徑的固定響應內容
+_ROOT_BYTES = orjson.dumps({"message": "歡迎使用網站爬蟲API"})
+
 @app.get("/")
 async def root():
     """API根路徑
@@ -80,12 +277,9 @@ async def root():
     {"message": "歡迎使用網站爬蟲API"}
     ```
     """
-    return JSONResponse(
-        content={"message": "歡迎使用網站爬蟲API"},
-        media_type="application/json; charset=utf-8"
-    )
+    return Response(content=_ROOT_BYTES, media_type="application/json")
 
-@app.post("/scrape", response_model=ScrapeResponse, tags=["爬蟲"])
+@app.post("/scrape", tags=["爬蟲"], responses={200: {"model": ScrapeResponse}})
 async def scrape(request: ScrapeRequest):
     """執行網站爬蟲
     
@@ -93,7 +287,7 @@ async def scrape(request: ScrapeRequest):
         request: 包含目標網站和參數的請求對象
         
     Returns:
-        ScrapeResponse: 包含爬取結果的響應對象
+        與ScrapeResponse格式相同的JSON響應
         
     使用curl命令示例:
     1. 基本爬蟲請求:
@@ -172,66 +366,71 @@ async def scrape(request: ScrapeRequest):
         ```
     """
     try:
-        # 檢查網站是否在配置中
-        scraper_base = ScraperBase('default')
-        available_sites = scraper_base.config['sites'].keys()
+        results = await _coalesced_scrape(request)
         
-        if request.site not in available_sites:
-            raise HTTPException(status_code=400, detail=f"不支持的網站: {request.site}，可用的網站有: {', '.join(available_sites)}")
-        
-        # 嘗試動態導入對應的爬蟲模組
-        module_name = f"{request.site}_scraper"
-        try:
-            # 嘗試導入特定網站的爬蟲模組
-            scraper_module = __import__(module_name)
-            scraper_class = getattr(scraper_module, f"{request.site.capitalize()}Scraper")
-            scraper = scraper_class()
-        except (ImportError, AttributeError) as e:
-            # 如果特定網站的爬蟲模組不存在，使用通用爬蟲
-            scraper = GenericScraper()
-            # 從配置中獲取網站的基礎URL
-            site_config = scraper_base.config['sites'].get(request.site, {})
-            base_url = site_config.get('base_url', '')
-            search_path = site_config.get('search_path', '')
-            
-            # 如果用戶沒有提供URL，則使用配置中的URL
-            if not request.url and base_url:
-                request.url = base_url
-                if search_path:
-                    request.url = f"{base_url}{search_path}"
-        
-        # 執行爬蟲
-        results = await scraper.scrape(
-            url=request.url,
-            params=request.params
-        )
-        
-        response = ScrapeResponse(
-            status="success",
-            data=results,
-            message=f"成功從 {request.site} 抓取 {len(results)} 條數據"
-        )
-        
-        return JSONResponse(
-            content=response.dict(),
-            media_type="application/json; charset=utf-8"
-        )
+        # 直接返回響應對象，跳過FastAPI對字典的jsonable_encoder走訪，只由orjson序列化一次
+        return ORJSONResponse({
+            "status": "success",
+            "data": results,
+            "message": f"成功從 {request.site} 抓取 {len(results)} 條數據"
+        })
         
     except HTTPException as e:
         # 直接重新拋出HTTP異常
         raise e
     except Exception as e:
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=500,
             content={
                 "status": "error",
                 "message": str(e),
                 "data": []
-            },
-            media_type="application/json; charset=utf-8"
+            }
         )
 
-@app.post("/scrape_url", response_model=ScrapeResponse, tags=["爬蟲"])
+@app.post("/scrape_batch", tags=["爬蟲"], responses={200: {"model": List[ScrapeResponse]}})
+async def scrape_batch(requests: List[ScrapeRequest]):
+    """批次執行多個網站爬蟲
+    
+    各請求共用瀏覽器池並行執行，同時執行的數量由環境變數 `SCRAPE_CONCURRENCY` 控制（預設為8），
+    單一請求失敗不影響其他請求
+    
+    Args:
+        requests: 爬蟲請求對象列表
+        
+    Returns:
+        與請求順序對應的結果列表，每項格式與 /scrape 的響應相同
+        
+    使用curl命令示例:
+    ```bash
+    curl -X POST http://localhost:8000/scrape_batch \
+        -H "Content-Type: application/json" \
+        -d '[
+            {"site": "eventsite", "params": {"p": "free"}},
+            {"site": "eventsite", "params": {"t": "next-week"}}
+        ]'
+    ```
+    """
+    sem = asyncio.Semaphore(int(os.getenv("SCRAPE_CONCURRENCY", 8)))
+    
+    async def one(request: ScrapeRequest) -> Dict[str, Any]:
+        async with sem:
+            try:
+                results = await _coalesced_scrape(request)
+            except HTTPException as e:
+                return {"status": "error", "data": [], "message": e.detail}
+            except Exception as e:
+                return {"status": "error", "data": [], "message": str(e)}
+        return {
+            "status": "success",
+            "data": results,
+            "message": f"成功從 {request.site} 抓取 {len(results)} 條數據"
+        }
+    
+    responses = await asyncio.gather(*(one(r) for r in requests))
+    return ORJSONResponse(responses)
+
+@app.post("/scrape_url", tags=["爬蟲"], responses={200: {"model": ScrapeResponse}})
 async def scrape_url(request: GenericScrapeRequest):
     """爬取任意URL的網頁內容
     
@@ -239,7 +438,7 @@ async def scrape_url(request: GenericScrapeRequest):
         request: 包含目標URL和參數的請求對象
         
     Returns:
-        ScrapeResponse: 包含爬取結果的響應對象
+        與ScrapeResponse格式相同的JSON串流
         
     使用curl命令示例:
     ```bash
@@ -280,35 +479,32 @@ async def scrape_url(request: GenericScrapeRequest):
         ```
     """
     try:
-        # 創建通用爬蟲實例
-        scraper = GenericScraper()
+        # 使用共用的通用爬蟲實例
+        scraper = app.state.generic_scraper
         
-        # 執行爬蟲
-        results = await scraper.scrape(
-            url=request.url,
-            params=request.params
-        )
+        # 從瀏覽器池借出上下文執行爬蟲
+        async with browser_pool.acquire() as context:
+            results = await scraper.scrape(
+                url=request.url,
+                params=request.params,
+                context=context,
+                include_html=request.include_html
+            )
         
-        response = ScrapeResponse(
-            status="success",
-            data=results,
-            message=f"成功爬取網頁內容"
-        )
-        
-        return JSONResponse(
-            content=response.dict(),
-            media_type="application/json; charset=utf-8"
+        # 結果可能包含完整HTML，以串流方式輸出
+        return StreamingResponse(
+            _stream_scrape_response(results, "成功爬取網頁內容"),
+            media_type="application/json"
         )
         
     except Exception as e:
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=500,
             content={
                 "status": "error",
                 "message": str(e),
                 "data": []
-            },
-            media_type="application/json; charset=utf-8"
+            }
         )
 
 @app.get("/sites")
@@ -325,23 +521,44 @@ def get_available_sites():
     {"sites": ["eventsite"]}
     ```
     """
-    # 從配置文件中讀取支持的網站
-    scraper = ScraperBase('default')
-    sites = list(scraper.config['sites'].keys())
-    return JSONResponse(
-        content={"sites": sites},
-        media_type="application/json; charset=utf-8"
-    )
+    return Response(content=_SITES_BYTES, media_type="application/json")
+
+@app.post("/sites/reload")
+async def reload_available_sites():
+    """重新讀取配置文件中的網站列表
+    
+    在事件迴圈中一次完成，不會與進行中的爬蟲請求交錯；同時清除已快取的爬取結果
+    
+    使用curl命令示例:
+    ```bash
+    curl -X POST http://localhost:8000/sites/reload
+    ```
+    
+    響應示例:
+    ```json
+    {"sites": ["eventsite"]}
+    ```
+    """
+    clear_config_cache()
+    _load_sites()
+    _build_scrapers()
+    _recent_scrapes.clear()
+    return Response(content=_SITES_BYTES, media_type="application/json")
 
 if __name__ == "__main__":
     import uvicorn
     # 獲取環境變量或使用默認值
     host = os.getenv("HOST", "0.0.0.0")
     port = int(os.getenv("PORT", 8000))
+    workers = int(os.getenv("WORKERS", 1))
+    reload = os.getenv("DEV", "0") == "1"  # 開發模式下啟用熱重載
     
     uvicorn.run(
         "main:app",
         host=host,
         port=port,
-        reload=True  # 開發模式下啟用熱重載
+        loop="auto",  # 已安裝uvloop時自動使用
+        http="auto",  # 已安裝httptools時自動使用
+        workers=workers,
+        reload=reload
     )
\ No newline at end of file
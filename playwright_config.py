@@ -1,7 +1,68 @@
 # Playwright在Vercel無伺服器環境的優化配置
 
-from typing import Dict, Any
+from typing import Dict, Any, Tuple
 import os
+import re
+from urllib.parse import urlsplit
+
+# 爬取時不需要的資源類型；樣式表可能影響無限捲動頁面的高度計算，需設定BLOCK_STYLESHEETS=1才攔截
+BLOCKED_RESOURCE_TYPES = frozenset(
+    {"image", "font", "media"} | ({"stylesheet"} if os.environ.get('BLOCK_STYLESHEETS', '0') == '1' else set())
+)
+
+# 第三方分析/廣告服務的網域，子網域也一併攔截
+BLOCKED_HOSTS = [
+    "google-analytics.com", "doubleclick.net", "googletagmanager.com",
+    "facebook.net", "hotjar.com", "hotjar.io",
+]
+
+# 合併成單一正規表示式，只比對請求的主機名稱結尾，不比對路徑或查詢字串
+_BLOCKED_HOSTS_RE = re.compile(r"(?:^|\.)(?:%s)$" % "|".join(re.escape(h) for h in BLOCKED_HOSTS))
+
+# 基本的Chromium啟動參數，減少記憶體使用
+_BASE_ARGS: Tuple[str, ...] = (
+    "--disable-gpu",
+    "--disable-dev-shm-usage",
+    "--disable-setuid-sandbox",
+    "--no-sandbox",
+    "--disable-extensions",
+    "--disable-accelerated-2d-canvas",
+    "--disable-web-security",
+    "--disable-background-networking",
+    "--disable-background-timer-throttling",
+    "--disable-backgrounding-occluded-windows",
+    "--disable-breakpad",
+    "--disable-component-extensions-with-background-pages",
+    # Chromium只採用最後一個--disable-features，需合併成一個參數
+    "--disable-features=TranslateUI,IsolateOrigins,site-per-process",
+    "--disable-ipc-flooding-protection",
+    "--disable-renderer-backgrounding",
+    "--mute-audio",
+    "--disable-default-apps",
+    "--disable-translate",
+    "--disable-sync",
+    "--hide-scrollbars",
+    "--metrics-recording-only",
+    "--no-first-run",
+    "--safebrowsing-disable-auto-update",
+    "--disable-threaded-animation",
+    "--disable-threaded-scrolling",
+    "--disable-histogram-customizer",
+    "--memory-pressure-off",
+    "--ignore-certificate-errors",
+    "--window-size=1280,720",
+)
+
+# Vercel環境中進一步限制資源使用的參數
+_VERCEL_ARGS: Tuple[str, ...] = (
+    # 無伺服器環境無法建立zygote子進程，只能以單進程運行
+    "--no-zygote",
+    "--single-process",
+    "--js-flags=--expose-gc",
+    "--disable-notifications",
+    "--disable-infobars",
+    "--disable-save-password-bubble",
+)
 
 def get_optimized_browser_config() -> Dict[str, Any]:
     """
@@ -13,64 +74,40 @@ def get_optimized_browser_config() -> Dict[str, Any]:
     # 檢測是否在Vercel環境中運行
     is_vercel = os.environ.get('VERCEL', '0') == '1'
     
-    # 基本配置
     config = {
         "headless": True,
-        # 減少記憶體使用
-        "args": [
-            "--disable-gpu",
-            "--disable-dev-shm-usage",
-            "--disable-setuid-sandbox",
-            "--no-sandbox",
-            "--no-zygote",
-            "--single-process",
-            "--disable-extensions",
-            "--disable-accelerated-2d-canvas",
-            "--disable-web-security",
-            "--disable-background-networking",
-            "--disable-background-timer-throttling",
-            "--disable-backgrounding-occluded-windows",
-            "--disable-breakpad",
-            "--disable-component-extensions-with-background-pages",
-            "--disable-features=TranslateUI,BlinkGenPropertyTrees",
-            "--disable-ipc-flooding-protection",
-            "--disable-renderer-backgrounding",
-            "--mute-audio",
-            "--disable-default-apps",
-            "--disable-sync",
-            "--hide-scrollbars",
-            "--metrics-recording-only",
-            "--no-first-run",
-            "--safebrowsing-disable-auto-update",
-            "--disable-features=site-per-process",
-            "--disable-threaded-animation",
-            "--disable-threaded-scrolling",
-            "--disable-histogram-customizer",
-            "--memory-pressure-off",
-            "--use-gl=swiftshader",
-            "--ignore-certificate-errors",
-            "--window-size=1280,720"
-        ],
+        "args": list(_BASE_ARGS + (_VERCEL_ARGS if is_vercel else ())),
         # 減少記憶體使用的額外選項
         "handle_sigint": False,
         "handle_sigterm": False,
         "handle_sighup": False
     }
     
-    # 在Vercel環境中的特殊配置
+    # 在Vercel環境中使用環境變數指定的Chromium可執行文件路徑
     if is_vercel:
-        # 使用環境變數中指定的Chromium可執行文件路徑
         executable_path = os.environ.get('PLAYWRIGHT_CHROMIUM_EXECUTABLE_PATH')
         if executable_path:
-            config['executablePath'] = executable_path
-        
-        # 在Vercel環境中進一步限制資源使用
-        config['args'].extend([
-            "--js-flags=--expose-gc",
-            "--disable-notifications",
-            "--disable-infobars",
-            "--disable-translate",
-            "--disable-save-password-bubble"
-        ])
+            config['executable_path'] = executable_path
+    
+    return config
+
+async def install_resource_blocker(target) -> None:
+    """
+    攔截圖片、字型、影音（及可選的樣式表）和第三方分析請求，加快頁面載入
+    
+    Args:
+        target: Playwright頁面或瀏覽器上下文對象，需在page.goto之前呼叫
+    """
+    async def _handle(route):
+        request = route.request
+        resource_type = request.resource_type
+        # 頁面本身（document）一律放行，避免目標網址剛好位於被攔截的網域時導航失敗
+        if resource_type != "document" and (
+            resource_type in BLOCKED_RESOURCE_TYPES
+            or _BLOCKED_HOSTS_RE.search(urlsplit(request.url).hostname or "")
+        ):
+            await route.abort()
+        else:
+            await route.continue_()
     
-    return config
\ No newline at end of file
+    await target.route("**/*", _handle)
@@ -1,7 +1,45 @@
 import yaml
+import orjson
 import logging
-from typing import Dict, List, Optional, Any
+from functools import lru_cache
+from typing import Dict, List, Optional, Any, Tuple
 from pathlib import Path
+from urllib.parse import urljoin, urlencode
+
+# 設置日誌，已由應用程式（例如uvicorn）設定時不覆蓋
+if not logging.getLogger().handlers:
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+# 有LibYAML時使用C實現的載入器，否則退回純Python版本
+_YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+# 各網站的日誌記錄器
+_LOGGER_CACHE: Dict[str, logging.Logger] = {}
+
+@lru_cache(maxsize=None)
+def _load_config_cached(config_path: str) -> Dict[str, Any]:
+    """讀取並解析配置文件，每個路徑在進程中只解析一次
+    
+    同目錄下有不比YAML舊的同名JSON檔（由scripts/yaml_to_json.py產生）時優先讀取JSON。
+    返回的字典在所有爬蟲實例間共用，不可修改
+    """
+    path = Path(config_path)
+    json_path = path.with_suffix('.json')
+    if json_path.exists() and (not path.exists() or json_path.stat().st_mtime >= path.stat().st_mtime):
+        return orjson.loads(json_path.read_bytes())
+    
+    return yaml.load(path.read_bytes(), Loader=_YAML_LOADER)
+
+def _params_items(params: Dict[str, Any]) -> Tuple[Tuple[str, Any], ...]:
+    """將參數字典轉為可雜湊的元組，列表值轉為元組（對應重複的查詢參數）"""
+    return tuple((k, tuple(v) if isinstance(v, list) else v) for k, v in params.items())
+
+def clear_config_cache() -> None:
+    """清除配置文件快取，下次建立爬蟲時重新讀取"""
+    _load_config_cached.cache_clear()
 
 class ScraperBase:
     """爬蟲基礎類，提供通用功能和配置管理"""
@@ -18,18 +56,23 @@ class ScraperBase:
         self.config = self._load_config()
         self.site_config = self.config['sites'].get(site_name, {})
         
-        # 設置日誌
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-        )
-        self.logger = logging.getLogger(f'scraper.{site_name}')
+        # 預先整理默認參數，列表值轉為元組以便作為URL快取的鍵
+        self._default_params_items: Tuple[Tuple[str, Any], ...] = _params_items(self.get_default_params())
+        
+        # 預先整理各類型的選擇器列表，避免每次查找時重複處理
+        self._selectors = {
+            selector_type: [selectors] if isinstance(selectors, str) else list(selectors)
+            for selector_type, selectors in self.site_config.get('selectors', {}).items()
+        }
+        
+        self.logger = _LOGGER_CACHE.get(site_name)
+        if self.logger is None:
+            self.logger = _LOGGER_CACHE.setdefault(site_name, logging.getLogger(f'scraper.{site_name}'))
     
     def _load_config(self) -> Dict[str, Any]:
         """加載配置文件"""
         try:
-            with open(self.config_path, 'r', encoding='utf-8') as f:
-                return yaml.safe_load(f)
+            return _load_config_cached(self.config_path)
         except Exception as e:
             raise Exception(f'加載配置文件失敗: {e}')
     
@@ -42,18 +85,15 @@ class ScraperBase:
         Returns:
             選擇器列表
         """
-        selectors = self.site_config.get('selectors', {}).get(selector_type, [])
-        if isinstance(selectors, str):
-            return [selectors]
-        return selectors
+        return self._selectors.get(selector_type, [])
     
     def get_base_url(self) -> str:
         """獲取網站基礎URL"""
         return self.site_config.get('base_url', '')
     
     def get_default_params(self) -> Dict[str, str]:
-        """獲取默認請求參數"""
-        return self.site_config.get('default_params', {})
+        """獲取默認請求參數（副本，可自由修改）"""
+        return dict(self.site_config.get('default_params', {}))
     
     def get_timeout(self) -> int:
         """獲取請求超時設置"""
@@ -77,19 +117,26 @@ class ScraperBase:
         Returns:
             完整的URL字符串
         """
-        from urllib.parse import urljoin, urlencode
-        
-        # 合併基礎URL和路徑
-        url = urljoin(self.get_base_url(), path.lstrip('/'))
+        # 沒有自定義參數時直接使用預先整理的默認參數
+        if not params:
+            return self._build_url(self.get_base_url(), path, self._default_params_items)
         
         # 合併默認參數和自定義參數
-        all_params = self.get_default_params()
-        if params:
-            all_params.update(params)
+        all_params = dict(self._default_params_items)
+        all_params.update(_params_items(params))
+        
+        return self._build_url(self.get_base_url(), path, tuple(all_params.items()))
+    
+    @staticmethod
+    @lru_cache(maxsize=1024)
+    def _build_url(base_url: str, path: str, params_items: Tuple[Tuple[str, Any], ...]) -> str:
+        """構建URL，相同的基礎URL、路徑和參數只計算一次"""
+        # 合併基礎URL和路徑
+        url = urljoin(base_url, path.lstrip('/'))
         
         # 添加參數到URL
-        if all_params:
-            url = f'{url}?{urlencode(all_params)}'
+        if params_items:
+            url = f'{url}?{urlencode(params_items, doseq=True)}'
         
         return url
     
@@ -0,0 +1,27 @@
+"""將config.yaml轉換為config.json
+
+服務啟動時若找到不比config.yaml舊的config.json，會直接以orjson讀取，省去YAML解析。
+修改config.yaml後需重新執行本腳本。
+
+使用方法:
+    python scripts/yaml_to_json.py [config.yaml路徑]
+"""
+import json
+import sys
+from pathlib import Path
+import yaml
+
+def main():
+    yaml_path = Path(sys.argv[1]) if len(sys.argv) > 1 else Path(__file__).resolve().parent.parent / 'config.yaml'
+    json_path = yaml_path.with_suffix('.json')
+    
+    with open(yaml_path, 'r', encoding='utf-8') as f:
+        config = yaml.safe_load(f)
+    
+    with open(json_path, 'w', encoding='utf-8') as f:
+        json.dump(config, f, ensure_ascii=False, indent=2)
+    
+    print(f'已產生 {json_path}')
+
+if __name__ == '__main__':
+    main()